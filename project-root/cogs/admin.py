@@ -1,5 +1,7 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
+from utils.scheduler import decoder_scheduler, resolver_scheduler
 
 class AdminCog(commands.Cog):
     """Cog for administrative commands."""
@@ -7,8 +9,9 @@ class AdminCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.command(name="clear_queue", description="Clears the current song queue.", brief="Clears the queue.")
+    @commands.hybrid_command(name="clear_queue", description="Clears the current song queue.", brief="Clears the queue.")
     @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
     async def clear_queue(self, ctx):
         """Clears the current song queue."""
         # Access the music queue from the MusicCog
@@ -20,8 +23,9 @@ class AdminCog(commands.Cog):
         music_cog.queue.clear()
         await ctx.send("Queue cleared.")
 
-    @commands.command(name="remove_song", description="Removes a specific song from the queue.", brief="Removes a song.")
+    @commands.hybrid_command(name="remove_song", description="Removes a specific song from the queue.", brief="Removes a song.")
     @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
     async def remove_song(self, ctx, song_index: int):
         """Removes a specific song from the queue."""
         # Access the music queue from the MusicCog
@@ -36,8 +40,24 @@ class AdminCog(commands.Cog):
         except IndexError:
             await ctx.send(f"Invalid song index. There are only {len(music_cog.queue)} songs in the queue.")
 
-    @commands.command(name="add_song", description="Adds a song to the queue (admin only).", brief="Adds a song to the queue.")
+    @remove_song.autocomplete("song_index")
+    async def remove_song_autocomplete(self, interaction, current: str):
+        """Suggests queue positions, labelled with the song at each position."""
+        music_cog = self.bot.get_cog("MusicCog")
+        if music_cog is None:
+            return []
+
+        choices = []
+        for i, song in enumerate(list(music_cog.queue._queue)):
+            name = f"{i + 1}. {song['title']} by {song['artist']}"[:100]
+            if current.lower() in name.lower():
+                choices.append(app_commands.Choice(name=name, value=i + 1))
+        return choices[:25]
+
+    @commands.hybrid_command(name="add_song", description="Adds a song to the queue (admin only).", brief="Adds a song to the queue.")
+    @commands.guild_only()
     @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
     async def add_song(self, ctx, *, song_name: str):
         """Adds a song to the queue (admin only)."""
         # Access the music player from the MusicCog
@@ -46,10 +66,11 @@ class AdminCog(commands.Cog):
             await ctx.send("Music cog not found. Song cannot be added.")
             return
 
-        await music_cog.play(ctx, song_name, admin_add=True)
+        await music_cog.play(ctx, song_name=song_name)
 
-    @commands.command(name="ban_user", description="Bans a user from using the bot.", brief="Bans a user.")
+    @commands.hybrid_command(name="ban_user", description="Bans a user from using the bot.", brief="Bans a user.")
     @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
     async def ban_user(self, ctx, member: discord.Member):
         """Bans a user from using the bot."""
         # You'll need to implement the banning logic based on your chosen database or storage method. 
@@ -57,16 +78,18 @@ class AdminCog(commands.Cog):
         # Here's a placeholder implementation:
         await ctx.send(f"{member.mention} has been banned from using the bot.")
 
-    @commands.command(name="unban_user", description="Unbans a user from using the bot.", brief="Unbans a user.")
+    @commands.hybrid_command(name="unban_user", description="Unbans a user from using the bot.", brief="Unbans a user.")
     @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
     async def unban_user(self, ctx, member: discord.Member):
         """Unbans a user from using the bot."""
         # You'll need to implement the unbanning logic based on your chosen database or storage method.
         # Here's a placeholder implementation:
         await ctx.send(f"{member.mention} has been unbanned from using the bot.")
 
-    @commands.command(name="view_logs", description="Displays the bot's activity logs.", brief="View logs.")
+    @commands.hybrid_command(name="view_logs", description="Displays the bot's activity logs.", brief="View logs.")
     @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
     async def view_logs(self, ctx):
         """Displays the bot's activity logs."""
         # You'll need to implement the logging logic using a logging library. 
@@ -74,6 +97,25 @@ class AdminCog(commands.Cog):
         # Here's a placeholder implementation:
         await ctx.send("Log viewer functionality is not yet implemented.")
 
-def setup(bot):
+    @commands.hybrid_command(name="scheduler_stats", description="Shows decoder and resolver queue depth and wait times.", brief="Scheduler stats.")
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    async def scheduler_stats(self, ctx):
+        """Shows decoder and resolver queue depth and wait times."""
+        stats_str = ""
+        for scheduler in (decoder_scheduler, resolver_scheduler):
+            metrics = scheduler.metrics()
+            depth = metrics["queue_depth"]
+            stats_str += (
+                f"**{metrics['name'].capitalize()}s:** {metrics['running']}/{metrics['capacity']} running, "
+                f"{depth['interactive']} interactive and {depth['prefetch']} prefetch waiting "
+                f"({metrics['queue_depth_by_guild'].get(ctx.guild.id, 0)} from this server)\n"
+            )
+            for priority, wait in metrics["wait_time"].items():
+                stats_str += f"- {priority} wait: avg {wait['average']:.2f}s, max {wait['max']:.2f}s over {wait['count']} requests\n"
+        await ctx.send(stats_str)
+
+async def setup(bot):
     """Setup function for the AdminCog."""
-    bot.add_cog(AdminCog(bot))
\ No newline at end of file
+    await bot.add_cog(AdminCog(bot))
\ No newline at end of file
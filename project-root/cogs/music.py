@@ -1,4 +1,5 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 import youtube_dl
 import spotipy
@@ -6,8 +7,12 @@ from spotipy.oauth2 import SpotifyClientCredentials
 import soundcloud
 import requests
 import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from utils.music_player import MusicPlayer
-from utils.config import Config
+from utils.config import get_settings
+from utils.database import Database
+from utils.scheduler import INTERACTIVE, PREFETCH, resolver_scheduler
 
 # Suppress noisy youtube_dl logging
 youtube_dl.utils.bug_reports_message = lambda: ''
@@ -21,11 +26,30 @@ class MusicCog(commands.Cog):
         self.voice_client = None
         self.current_song = None
         self.music_player = MusicPlayer()
-        self.config = Config()
+        settings = get_settings()
+
+        # Playback and prefetch tasks, kept so stop, leave and unload can cancel them
+        self.tasks = set()
+
+        # Threads resolving tracks, sized from the settings on first use
+        self.resolver_pool = None
+        self.resolver_pool_size = None
+
+        # Track metadata and cached loudness; disabled without a usable database
+        self.database = None
+        if settings.database_type:
+            database = Database()
+            database.connect()
+            if database.is_connected():
+                database.create_tracks_table()
+                self.database = database
+        if self.database is None:
+            print("No database available, loudness normalization cache disabled.")
+        self.loudness_cache = OrderedDict()
 
         # Spotify API credentials
-        self.spotify_client_id = self.config.get_value("SPOTIFY_CLIENT_ID")
-        self.spotify_client_secret = self.config.get_value("SPOTIFY_CLIENT_SECRET")
+        self.spotify_client_id = settings.spotify_client_id
+        self.spotify_client_secret = settings.spotify_client_secret
         self.spotify_client_credentials_manager = SpotifyClientCredentials(
             client_id=self.spotify_client_id,
             client_secret=self.spotify_client_secret
@@ -33,11 +57,75 @@ class MusicCog(commands.Cog):
         self.spotify = spotipy.Spotify(client_credentials_manager=self.spotify_client_credentials_manager)
 
         # SoundCloud API credentials
-        self.soundcloud_client_id = self.config.get_value("SOUNDCLOUD_CLIENT_ID")
-        self.soundcloud_client_secret = self.config.get_value("SOUNDCLOUD_CLIENT_SECRET")
+        self.soundcloud_client_id = settings.soundcloud_client_id
+        self.soundcloud_client_secret = settings.soundcloud_client_secret
         self.soundcloud = soundcloud.Client(client_id=self.soundcloud_client_id, client_secret=self.soundcloud_client_secret)
 
-    @commands.command(name="play", description="Plays a song from YouTube, Spotify, or SoundCloud.")
+    def cog_unload(self):
+        """Cancels pending playback and shuts down the resolver pool."""
+        self.cancel_tasks()
+        if self.resolver_pool:
+            self.resolver_pool.shutdown(wait=False)
+
+    def start_task(self, coro):
+        """Starts a background task, keeping a reference so it can be cancelled."""
+        task = self.bot.loop.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def cancel_tasks(self):
+        """Cancels playback and prefetch tasks, including tracks still waiting for a decoder."""
+        for task in list(self.tasks):
+            task.cancel()
+        # A track cancelled before reaching the player leaves its reservation behind
+        self.music_player.starting = False
+
+    async def run_resolver(self, func, guild_id, priority=INTERACTIVE):
+        """Runs a blocking resolve call on the resolver pool once the guild gets a resolver slot."""
+        workers = get_settings().resolver_workers
+        if self.resolver_pool is None or self.resolver_pool_size != workers:
+            # Pool size changed on reload; let in-flight resolves finish on the old pool
+            if self.resolver_pool:
+                self.resolver_pool.shutdown(wait=False)
+            self.resolver_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="resolver")
+            self.resolver_pool_size = workers
+        async with resolver_scheduler.slot(guild_id, priority):
+            return await self.bot.loop.run_in_executor(self.resolver_pool, func)
+
+    async def run_database(self, func):
+        """Runs a blocking database call off the event loop."""
+        return await self.bot.loop.run_in_executor(None, func)
+
+    async def get_loudness(self, track_id, run=None):
+        """Returns the cached (loudness, peak) of a track, consulting the database on a miss.
+
+        Args:
+            track_id: The stable identifier (page URL) of the track.
+            run: Coroutine function running the blocking lookup; defaults to run_database.
+        """
+        if track_id in self.loudness_cache:
+            self.loudness_cache.move_to_end(track_id)
+            return self.loudness_cache[track_id]
+        if self.database is None:
+            return None
+
+        levels = await (run or self.run_database)(lambda: self.database.get_track_loudness(track_id))
+        # Misses aren't cached, so values measured elsewhere are picked up on the next lookup
+        if levels is not None:
+            self.cache_loudness(track_id, levels)
+        return levels
+
+    def cache_loudness(self, track_id, levels):
+        """Stores a (loudness, peak) value, evicting the least recently used entries."""
+        self.loudness_cache[track_id] = levels
+        self.loudness_cache.move_to_end(track_id)
+        while len(self.loudness_cache) > get_settings().loudness_cache_size:
+            self.loudness_cache.popitem(last=False)
+
+    @commands.hybrid_command(name="play", description="Plays a song from YouTube, Spotify, or SoundCloud.")
+    @commands.guild_only()
+    @app_commands.describe(song_name="The name or URL of the song to play.")
     async def play(self, ctx, *, song_name: str):
         """Plays a song from YouTube, Spotify, or SoundCloud.
 
@@ -46,6 +134,9 @@ class MusicCog(commands.Cog):
             song_name: The name or URL of the song to play.
         """
         try:
+            # Acknowledge the interaction right away; results are sent as follow-ups
+            await ctx.defer()
+
             # Check if the bot is already connected to a voice channel
             if not ctx.author.voice:
                 await ctx.send("You need to be in a voice channel to use this command.")
@@ -68,6 +159,24 @@ class MusicCog(commands.Cog):
             print(f"Error in play command: {e}")
             await ctx.send(f"An error occurred while playing the song: {e}")
 
+    @play.autocomplete("song_name")
+    async def play_autocomplete(self, interaction, current: str):
+        """Suggests previously played tracks matching the typed text."""
+        if not current or self.database is None:
+            return []
+
+        choices = []
+        tracks = await self.run_database(lambda: self.database.search_tracks(current, limit=25))
+        for title, artist, track_id in tracks:
+            name = f"{title} by {artist}"[:100]
+            # Only YouTube URLs are played directly; Spotify and SoundCloud URLs would be
+            # treated as search text, so search by title and artist instead.
+            # Choice values are capped at 100 characters.
+            is_youtube = "youtube.com" in track_id or "youtu.be" in track_id
+            value = track_id if is_youtube and len(track_id) <= 100 else f"{title} {artist}"[:100]
+            choices.append(app_commands.Choice(name=name, value=value))
+        return choices
+
     async def play_youtube(self, ctx, song_name: str):
         """Plays a song from YouTube."""
         try:
@@ -78,13 +187,16 @@ class MusicCog(commands.Cog):
                 'noplaylist': True,
             }
             with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(song_name, download=False)
+                # Resolve off the event loop so other commands keep responding
+                info = await self.run_resolver(lambda: ydl.extract_info(song_name, download=False), ctx.guild.id)
                 url = info['formats'][0]['url']
                 title = info['title']
                 artist = info.get('artist', 'Unknown Artist')
+                track_id = info.get('webpage_url', url)
 
             # Add the song to the queue
-            await self.queue.put({'url': url, 'title': title, 'artist': artist})
+            await self.queue.put({'url': url, 'track_id': track_id, 'title': title, 'artist': artist})
+            await ctx.send(f"Queued: **{title}** by **{artist}**")
 
             # Start playing the next song
             await self.play_next(ctx)
@@ -97,7 +209,7 @@ class MusicCog(commands.Cog):
         """Plays a song from Spotify."""
         try:
             # Search Spotify for the song
-            results = self.spotify.search(q=song_name, type="track", limit=1)
+            results = await self.run_resolver(lambda: self.spotify.search(q=song_name, type="track", limit=1), ctx.guild.id)
             if results['tracks']['items']:
                 track = results['tracks']['items'][0]
                 track_url = track['external_urls']['spotify']
@@ -105,7 +217,8 @@ class MusicCog(commands.Cog):
                 artist = track['artists'][0]['name']
 
                 # Add the song to the queue
-                await self.queue.put({'url': track_url, 'title': title, 'artist': artist})
+                await self.queue.put({'url': track_url, 'track_id': track_url, 'title': title, 'artist': artist})
+                await ctx.send(f"Queued: **{title}** by **{artist}**")
 
                 # Start playing the next song
                 await self.play_next(ctx)
@@ -120,7 +233,7 @@ class MusicCog(commands.Cog):
         """Plays a song from SoundCloud."""
         try:
             # Search SoundCloud for the song
-            results = self.soundcloud.get('/tracks', q=song_name)
+            results = await self.run_resolver(lambda: self.soundcloud.get('/tracks', q=song_name), ctx.guild.id)
             if results:
                 track = results[0]
                 track_url = track.permalink_url
@@ -128,7 +241,8 @@ class MusicCog(commands.Cog):
                 artist = track.user['username']
 
                 # Add the song to the queue
-                await self.queue.put({'url': track_url, 'title': title, 'artist': artist})
+                await self.queue.put({'url': track_url, 'track_id': track_url, 'title': title, 'artist': artist})
+                await ctx.send(f"Queued: **{title}** by **{artist}**")
 
                 # Start playing the next song
                 await self.play_next(ctx)
@@ -143,18 +257,62 @@ class MusicCog(commands.Cog):
         """Plays the next song in the queue."""
         try:
             if self.voice_client and self.voice_client.is_connected():
-                if not self.music_player.is_playing():
-                    next_song = await self.queue.get()
+                if not self.music_player.is_playing() and not self.queue.empty():
+                    next_song = self.queue.get_nowait()
                     self.current_song = next_song
-                    self.music_player.play(next_song['url'], self.voice_client)
-
-                    await ctx.send(f"Now playing: **{self.current_song['title']}** by **{self.current_song['artist']}**")
+                    # Reserve before yielding, so a concurrent play_next can't start a second track
+                    self.music_player.reserve()
+                    self.start_task(self.play_track(ctx, next_song))
 
         except Exception as e:
             print(f"Error in play_next: {e}")
             await ctx.send(f"An error occurred while playing the next song: {e}")
 
-    @commands.command(name="skip", description="Skips the current song.")
+    async def play_track(self, ctx, song):
+        """Plays a song, applying its cached loudness or measuring it on first play.
+
+        "Now playing" is only announced once a decoder has been granted.
+        """
+        async def announce():
+            try:
+                await ctx.send(f"Now playing: **{song['title']}** by **{song['artist']}**")
+            except Exception as e:
+                print(f"Error announcing song: {e}")
+
+        try:
+            track_id = song.get('track_id', song['url'])
+            guild_id = self.voice_client.guild.id
+            loudness, peak = await self.get_loudness(track_id) or (None, None)
+            self.start_task(self.prefetch_loudness(guild_id))
+
+            measured = await self.music_player.play(
+                song['url'], self.voice_client, loudness=loudness, peak=peak, guild_id=guild_id, on_start=announce
+            )
+            if measured is not None:
+                self.cache_loudness(track_id, measured)
+                if self.database is not None:
+                    await self.run_database(
+                        lambda: self.database.save_track_loudness(track_id, song['title'], song['artist'], *measured)
+                    )
+
+        except Exception as e:
+            print(f"Error in play_track: {e}")
+            # Release the reservation made in play_next if playback never started
+            if self.music_player.player is None:
+                self.music_player.starting = False
+
+    async def prefetch_loudness(self, guild_id):
+        """Looks up the upcoming songs' loudness so they start without a database round trip."""
+        try:
+            # Each lookup waits behind interactive resolves for a resolver thread
+            run = lambda func: self.run_resolver(func, guild_id, PREFETCH)
+            for upcoming in list(self.queue._queue)[:get_settings().prefetch_depth]:
+                await self.get_loudness(upcoming.get('track_id', upcoming['url']), run=run)
+
+        except Exception as e:
+            print(f"Error in prefetch_loudness: {e}")
+
+    @commands.hybrid_command(name="skip", description="Skips the current song.")
     async def skip(self, ctx):
         """Skips the current song."""
         try:
@@ -166,28 +324,36 @@ class MusicCog(commands.Cog):
 
                 else:
                     await ctx.send("No song is currently playing.")
+            else:
+                # Slash commands must always be answered
+                await ctx.send("I'm not connected to a voice channel.")
 
         except Exception as e:
             print(f"Error in skip command: {e}")
             await ctx.send(f"An error occurred while skipping the song: {e}")
 
-    @commands.command(name="stop", description="Stops the music and clears the queue.")
+    @commands.hybrid_command(name="stop", description="Stops the music and clears the queue.")
     async def stop(self, ctx):
         """Stops the music and clears the queue."""
         try:
             if self.voice_client and self.voice_client.is_connected():
                 if self.music_player.is_playing():
-                    self.music_player.stop()
+                    self.cancel_tasks()
+                    await self.music_player.stop()
                     await ctx.send("Music stopped.")
                     await self.voice_client.disconnect()
                     self.voice_client = None
                     self.queue = asyncio.Queue()  # Clear the queue
+                else:
+                    await ctx.send("No song is currently playing.")
+            else:
+                await ctx.send("I'm not connected to a voice channel.")
 
         except Exception as e:
             print(f"Error in stop command: {e}")
             await ctx.send(f"An error occurred while stopping the music: {e}")
 
-    @commands.command(name="pause", description="Pauses the current song.")
+    @commands.hybrid_command(name="pause", description="Pauses the current song.")
     async def pause(self, ctx):
         """Pauses the current song."""
         try:
@@ -197,12 +363,14 @@ class MusicCog(commands.Cog):
                     await ctx.send("Music paused.")
                 else:
                     await ctx.send("No song is currently playing.")
+            else:
+                await ctx.send("I'm not connected to a voice channel.")
 
         except Exception as e:
             print(f"Error in pause command: {e}")
             await ctx.send(f"An error occurred while pausing the music: {e}")
 
-    @commands.command(name="resume", description="Resumes the current song.")
+    @commands.hybrid_command(name="resume", description="Resumes the current song.")
     async def resume(self, ctx):
         """Resumes the current song."""
         try:
@@ -212,12 +380,14 @@ class MusicCog(commands.Cog):
                     await ctx.send("Music resumed.")
                 else:
                     await ctx.send("No song is currently paused.")
+            else:
+                await ctx.send("I'm not connected to a voice channel.")
 
         except Exception as e:
             print(f"Error in resume command: {e}")
             await ctx.send(f"An error occurred while resuming the music: {e}")
 
-    @commands.command(name="queue", description="Shows the current song queue.")
+    @commands.hybrid_command(name="queue", description="Shows the current song queue.")
     async def queue(self, ctx):
         """Shows the current song queue."""
         try:
@@ -235,10 +405,13 @@ class MusicCog(commands.Cog):
             print(f"Error in queue command: {e}")
             await ctx.send(f"An error occurred while displaying the queue: {e}")
 
-    @commands.command(name="join", description="Joins the user's voice channel.")
+    @commands.hybrid_command(name="join", description="Joins the user's voice channel.")
     async def join(self, ctx):
         """Joins the user's voice channel."""
         try:
+            # Connecting to voice can outlast the interaction response window
+            await ctx.defer()
+
             if not ctx.author.voice:
                 await ctx.send("You need to be in a voice channel to use this command.")
                 return
@@ -250,20 +423,24 @@ class MusicCog(commands.Cog):
             print(f"Error in join command: {e}")
             await ctx.send(f"An error occurred while joining the voice channel: {e}")
 
-    @commands.command(name="leave", description="Leaves the current voice channel.")
+    @commands.hybrid_command(name="leave", description="Leaves the current voice channel.")
     async def leave(self, ctx):
         """Leaves the current voice channel."""
         try:
             if self.voice_client and self.voice_client.is_connected():
+                self.cancel_tasks()
                 await self.voice_client.disconnect()
                 self.voice_client = None
                 await ctx.send("Left the voice channel.")
+            else:
+                await ctx.send("I'm not connected to a voice channel.")
 
         except Exception as e:
             print(f"Error in leave command: {e}")
             await ctx.send(f"An error occurred while leaving the voice channel: {e}")
 
-    @commands.command(name="volume", description="Adjusts the volume of the music.")
+    @commands.hybrid_command(name="volume", description="Adjusts the volume of the music.")
+    @app_commands.describe(volume="The desired volume (0-100).")
     async def volume(self, ctx, volume: int):
         """Adjusts the volume of the music.
 
@@ -278,10 +455,12 @@ class MusicCog(commands.Cog):
                     await ctx.send(f"Volume set to {volume}%")
                 else:
                     await ctx.send("Volume must be between 0 and 100.")
+            else:
+                await ctx.send("I'm not connected to a voice channel.")
 
         except Exception as e:
             print(f"Error in volume command: {e}")
             await ctx.send(f"An error occurred while adjusting the volume: {e}")
 
-def setup(bot):
-    bot.add_cog(MusicCog(bot))
\ No newline at end of file
+async def setup(bot):
+    await bot.add_cog(MusicCog(bot))
\ No newline at end of file
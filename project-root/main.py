@@ -1,35 +1,51 @@
 import os
 import discord
 from discord.ext import commands
-from dotenv import load_dotenv
+from utils.config import get_settings, watch_settings
 
-load_dotenv()
-
-# Load environment variables
-DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
-DATABASE_HOST = os.getenv("DATABASE_HOST")
-DATABASE_USER = os.getenv("DATABASE_USER")
-DATABASE_PASSWORD = os.getenv("DATABASE_PASSWORD")
-DATABASE_NAME = os.getenv("DATABASE_NAME")
+# Parsed and validated once; raises on invalid configuration
+settings = get_settings()
 
 # Create bot instance
 intents = discord.Intents.default()
 intents.members = True  # Enable member intents to access member data
-intents.message_content = True  # Enable message content intents for message processing
-bot = commands.Bot(command_prefix="!", intents=intents)
+if settings.prefix_commands:
+    intents.message_content = True  # Enable message content intents for message processing
+    command_prefix = "!"
+else:
+    # Without prefix commands there is no reason to receive message events at all
+    intents.messages = False
+    command_prefix = commands.when_mentioned
+
+
+class MusicBot(commands.Bot):
+    """Bot that loads the cogs and registers their slash commands before connecting."""
+
+    async def setup_hook(self):
+        # Pick up changes to the config file without restarting
+        self.settings_watcher = self.loop.create_task(watch_settings())
+
+        # Load cogs
+        for filename in os.listdir("./cogs"):
+            if filename.endswith(".py"):
+                await self.load_extension(f"cogs.{filename[:-3]}")
+                print(f"Loaded cog: {filename[:-3]}")
+
+        # Registering the slash commands is rate limited, so only do it when asked to
+        if settings.sync_commands:
+            synced = await self.tree.sync()
+            print(f"Synced {len(synced)} slash commands")
+
+
+bot = MusicBot(command_prefix=command_prefix, intents=intents)
 
-# Load cogs
 @bot.event
 async def on_ready():
     print(f"Logged in as {bot.user.name}")
-    for filename in os.listdir("./cogs"):
-        if filename.endswith(".py"):
-            bot.load_extension(f"cogs.{filename[:-3]}")
-            print(f"Loaded cog: {filename[:-3]}")
 
 # Connect to the database
 # ... (Implement database connection logic using PyMySQL, psycopg2, or pymongo)
 
 # Start the bot
 if __name__ == "__main__":
-    bot.run(DISCORD_TOKEN)
\ No newline at end of file
+    bot.run(settings.discord_token)
@@ -0,0 +1,93 @@
+import dataclasses
+import pytest
+from utils import config
+from utils.config import Settings, load_settings
+
+
+@pytest.fixture
+def settings_file(tmp_path, monkeypatch):
+    """Returns a config file path, and restores the shared snapshot after the test."""
+    monkeypatch.setattr(config, "_settings", config.get_settings())
+    return tmp_path / "settings.env"
+
+
+def test_bool_and_optional_parsing(monkeypatch):
+    monkeypatch.setenv("PREFIX_COMMANDS", "no")
+    monkeypatch.setenv("SYNC_COMMANDS", "1")
+    monkeypatch.setenv("DATABASE_HOST", "")
+    monkeypatch.setenv("SPOTIFY_CLIENT_ID", "abc")
+    monkeypatch.setenv("RESOLVER_WORKERS", "8")
+    monkeypatch.setenv("TARGET_LOUDNESS", "-14.5")
+
+    settings = load_settings(path=None)
+
+    assert settings.prefix_commands is False
+    assert settings.sync_commands is True
+    assert settings.database_host is None
+    assert settings.spotify_client_id == "abc"
+    assert settings.resolver_workers == 8
+    assert settings.target_loudness == -14.5
+
+
+def test_settings_are_immutable():
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        load_settings(path=None).resolver_workers = 1
+
+
+def test_config_file_overrides_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("PREFETCH_DEPTH", "2")
+    path = tmp_path / "settings.env"
+    path.write_text("PREFETCH_DEPTH=5\n")
+
+    assert load_settings(path=str(path)).prefetch_depth == 5
+
+
+@pytest.mark.parametrize("key, value", [
+    ("PREFIX_COMMANDS", "maybe"),
+    ("RESOLVER_WORKERS", "many"),
+    ("MAX_DECODERS", "0"),
+    ("PREFETCH_DEPTH", "-1"),
+    ("DEFAULT_VOLUME", "2"),
+    ("RELOAD_INTERVAL", "0"),
+    ("DATABASE_TYPE", "sqlite"),
+    ("GUILD_WEIGHTS", "123:0"),
+    ("GUILD_WEIGHTS", "123"),
+    ("GUILD_WEIGHTS", "abc:2"),
+])
+def test_invalid_values_raise(monkeypatch, key, value):
+    monkeypatch.setenv(key, value)
+    with pytest.raises(ValueError):
+        load_settings(path=None)
+
+
+def test_guild_weights_are_parsed():
+    settings = Settings(guild_weights="123:2, 456:0.5,")
+    assert settings.guild_weight_map == {123: 2.0, 456: 0.5}
+
+
+def test_reload_applies_valid_changes(settings_file):
+    settings_file.write_text("PREFETCH_DEPTH=7\n")
+
+    assert config.reload_settings(str(settings_file))
+    assert config.get_settings().prefetch_depth == 7
+
+
+def test_failed_reload_keeps_previous_snapshot(settings_file):
+    previous = config.get_settings()
+    settings_file.write_text("PREFETCH_DEPTH=7\nMAX_DECODERS=0\n")
+
+    assert not config.reload_settings(str(settings_file))
+    assert config.get_settings() is previous
+
+
+def test_restart_only_fields_are_kept_on_reload(settings_file):
+    previous = config.get_settings()
+    settings_file.write_text(
+        "DISCORD_TOKEN=changed\nDATABASE_NAME=changed\nPREFIX_COMMANDS=false\nPREFETCH_DEPTH=9\n"
+    )
+
+    assert config.reload_settings(str(settings_file))
+    reloaded = config.get_settings()
+    for name in config._RESTART_ONLY:
+        assert getattr(reloaded, name) == getattr(previous, name)
+    assert reloaded.prefetch_depth == 9
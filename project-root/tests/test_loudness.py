@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from utils.config import get_settings
+from utils.loudness import SAMPLE_RATE, LoudnessMeter, normalization_gain
+
+
+def sine_pcm(amplitude, seconds=5, frequency=997):
+    """Returns a stereo s16le sine wave at the given amplitude (1.0 = full scale)."""
+    t = np.arange(SAMPLE_RATE * seconds) / SAMPLE_RATE
+    wave = amplitude * np.sin(2 * np.pi * frequency * t)
+    return (np.repeat(wave[:, None], 2, axis=1) * 32767).astype("<i2").tobytes()
+
+
+def measure(pcm, chunk_size=4093):
+    """Feeds PCM in odd-sized chunks, as ffmpeg reads would split it."""
+    meter = LoudnessMeter()
+    for i in range(0, len(pcm), chunk_size):
+        meter.feed(pcm[i:i + chunk_size])
+    return meter
+
+
+def test_full_scale_sine_reads_zero_lufs():
+    meter = measure(sine_pcm(1.0))
+    assert meter.integrated_loudness() == pytest.approx(0.0, abs=0.05)
+    assert meter.peak_level() == pytest.approx(0.0, abs=0.05)
+
+
+def test_minus_20_dbfs_sine_reads_minus_20_lufs():
+    meter = measure(sine_pcm(0.1))
+    assert meter.integrated_loudness() == pytest.approx(-20.0, abs=0.05)
+    assert meter.peak_level() == pytest.approx(-20.0, abs=0.05)
+
+
+def test_silence_is_not_measured():
+    meter = measure(bytes(SAMPLE_RATE * 4 * 2))
+    assert meter.integrated_loudness() is None
+    assert meter.peak_level() is None
+
+
+def test_too_short_is_not_measured():
+    meter = measure(sine_pcm(0.1, seconds=0.2))
+    assert meter.integrated_loudness() is None
+
+
+def test_gain_moves_towards_target():
+    settings = get_settings()
+    assert normalization_gain(None) == 0.0
+    assert normalization_gain(settings.target_loudness + 3) == pytest.approx(-3.0)
+
+
+def test_gain_is_clamped_to_maximum():
+    settings = get_settings()
+    max_gain = settings.max_normalization_gain
+    assert normalization_gain(settings.target_loudness - 100) == pytest.approx(max_gain)
+    assert normalization_gain(settings.target_loudness + 100) == pytest.approx(-max_gain)
+
+
+def test_gain_is_limited_to_peak_headroom():
+    target = get_settings().target_loudness
+    # Needs +6 dB but only has 2 dB of headroom
+    assert normalization_gain(target - 6, peak=-2.0) == pytest.approx(2.0)
+    # A track already peaking above full scale gets no boost
+    assert normalization_gain(target - 6, peak=0.5) == 0.0
+    # Headroom doesn't affect attenuation
+    assert normalization_gain(target + 6, peak=-0.1) == pytest.approx(-6.0)
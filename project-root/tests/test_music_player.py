@@ -0,0 +1,81 @@
+import asyncio
+import subprocess
+import sys
+import types
+import pytest
+from utils import music_player
+from utils.music_player import MusicPlayer
+from utils.scheduler import decoder_scheduler
+
+# Stands in for ffmpeg: writes PCM at a steady pace forever, so it only exits when killed
+ENDLESS_DECODER = (
+    "import sys, time\n"
+    "while True:\n"
+    "    sys.stdout.buffer.write(bytes(4096))\n"
+    "    sys.stdout.flush()\n"
+    "    time.sleep(0.005)\n"
+)
+
+
+class FakeVoiceClient:
+    def __init__(self, error=None):
+        self.error = error
+        self.chunks = 0
+
+    def play(self, source):
+        self.chunks += 1
+        if self.error:
+            raise self.error
+
+
+@pytest.fixture
+def decoders(monkeypatch):
+    """Replaces ffmpeg with an endless writer and returns the spawned processes."""
+    processes = []
+    create_subprocess_exec = asyncio.create_subprocess_exec
+
+    async def spawn(*args, **kwargs):
+        process = await create_subprocess_exec(sys.executable, "-c", ENDLESS_DECODER, stdout=subprocess.PIPE)
+        processes.append(process)
+        return process
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", spawn)
+    fake_discord = types.SimpleNamespace(
+        PCMVolumeTransformer=lambda source, volume: source,
+        Audio=lambda data: data,
+    )
+    monkeypatch.setattr(music_player, "discord", fake_discord, raising=False)
+    return processes
+
+
+def test_decoder_is_killed_when_playback_fails(decoders):
+    async def scenario():
+        player = MusicPlayer()
+        result = await player.play("stream", FakeVoiceClient(RuntimeError("voice failed")), loudness=-16.0, guild_id=1)
+
+        assert result is None
+        assert decoders[0].returncode is not None
+        assert not player.is_playing()
+        assert decoder_scheduler.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_decoder_is_killed_when_playback_is_cancelled(decoders):
+    async def scenario():
+        player = MusicPlayer()
+        voice_client = FakeVoiceClient()
+        task = asyncio.create_task(player.play("stream", voice_client, loudness=-16.0, guild_id=1))
+        while voice_client.chunks < 3:
+            await asyncio.sleep(0.01)
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert decoders[0].returncode is not None
+        assert not player.is_playing()
+        assert decoder_scheduler.active == 0
+        assert not decoder_scheduler.running
+
+    asyncio.run(scenario())
@@ -0,0 +1,145 @@
+import asyncio
+from utils.scheduler import FairScheduler, INTERACTIVE, PREFETCH
+
+
+def make_scheduler(capacity=1, quota=1, weights=None):
+    weights = weights or {}
+    return FairScheduler(
+        "test",
+        capacity=lambda: capacity,
+        guild_quota=lambda: quota,
+        guild_weight=lambda guild_id: weights.get(guild_id, 1.0),
+    )
+
+
+async def run_jobs(scheduler, jobs):
+    """Queues (guild_id, priority) jobs in order and returns the order they ran in."""
+    order = []
+
+    async def job(guild_id, priority):
+        async with scheduler.slot(guild_id, priority):
+            order.append(guild_id if priority == INTERACTIVE else f"{guild_id}:prefetch")
+            await asyncio.sleep(0)
+
+    # Hold the only slot until every job is queued
+    await scheduler.acquire("holder")
+    tasks = [asyncio.create_task(job(guild_id, priority)) for guild_id, priority in jobs]
+    await asyncio.sleep(0)
+    scheduler.release("holder")
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_guilds_are_interleaved():
+    scheduler = make_scheduler()
+    jobs = [("A", INTERACTIVE)] * 4 + [("B", INTERACTIVE)] * 2
+    order = asyncio.run(run_jobs(scheduler, jobs))
+    assert order == ["A", "B", "A", "B", "A", "A"]
+
+
+def test_weights_give_larger_share():
+    scheduler = make_scheduler(weights={"A": 2.0})
+    jobs = [("A", INTERACTIVE)] * 4 + [("B", INTERACTIVE)] * 2
+    order = asyncio.run(run_jobs(scheduler, jobs))
+    assert order == ["A", "A", "B", "A", "A", "B"]
+
+
+def test_interactive_before_prefetch():
+    scheduler = make_scheduler()
+    jobs = [("A", PREFETCH), ("A", PREFETCH), ("B", INTERACTIVE)]
+    order = asyncio.run(run_jobs(scheduler, jobs))
+    assert order == ["B", "A:prefetch", "A:prefetch"]
+
+
+def test_prefetch_backlog_does_not_delay_own_interactive_requests():
+    scheduler = make_scheduler()
+    jobs = [("A", PREFETCH)] * 3 + [("B", INTERACTIVE)] * 3 + [("A", INTERACTIVE)]
+    order = asyncio.run(run_jobs(scheduler, jobs))
+    assert order == ["B", "A", "B", "B", "A:prefetch", "A:prefetch", "A:prefetch"]
+
+
+def test_guild_quota_leaves_room_for_others():
+    async def scenario():
+        scheduler = make_scheduler(capacity=3, quota=1)
+        await scheduler.acquire("A")
+        waiting_a = asyncio.create_task(scheduler.acquire("A"))
+        await scheduler.acquire("B")
+        await asyncio.sleep(0)
+
+        # A is at its quota, so its second request waits despite a free slot
+        assert not waiting_a.done()
+        assert scheduler.active == 2
+        assert scheduler.queue_depth("A") == 1
+
+        scheduler.release("A")
+        await waiting_a
+        assert scheduler.running["A"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_is_removed():
+    async def scenario():
+        scheduler = make_scheduler()
+        await scheduler.acquire("A")
+        waiter = asyncio.create_task(scheduler.acquire("B"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        assert scheduler.queue_depth() == 0
+        assert ("B", INTERACTIVE) not in scheduler.finish_tags
+        scheduler.release("A")
+        assert scheduler.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancel_after_grant_releases_slot():
+    async def scenario():
+        scheduler = make_scheduler()
+        await scheduler.acquire("A")
+        waiter = asyncio.create_task(scheduler.acquire("B"))
+        await asyncio.sleep(0)
+
+        # The slot is handed to B, but B is cancelled before it resumes
+        scheduler.release("A")
+        waiter.cancel()
+        results = await asyncio.gather(waiter, return_exceptions=True)
+
+        assert isinstance(results[0], asyncio.CancelledError)
+        assert scheduler.active == 0
+        assert not scheduler.running
+        await asyncio.wait_for(scheduler.acquire("C"), timeout=1)
+
+    asyncio.run(scenario())
+
+
+def test_metrics():
+    async def scenario():
+        scheduler = make_scheduler()
+        await scheduler.acquire("A")
+        waiters = [
+            asyncio.create_task(scheduler.acquire("B")),
+            asyncio.create_task(scheduler.acquire("B", PREFETCH)),
+        ]
+        await asyncio.sleep(0)
+
+        metrics = scheduler.metrics()
+        assert metrics["running"] == 1
+        assert metrics["capacity"] == 1
+        assert metrics["queue_depth"] == {"interactive": 1, "prefetch": 1}
+        assert metrics["queue_depth_by_guild"] == {"B": 2}
+
+        scheduler.release("A")
+        await waiters[0]
+        scheduler.release("B")
+        await waiters[1]
+        scheduler.release("B")
+
+        wait_time = scheduler.metrics()["wait_time"]
+        assert wait_time["interactive"]["count"] == 2
+        assert wait_time["prefetch"]["count"] == 1
+        assert wait_time["prefetch"]["max"] >= 0
+
+    asyncio.run(scenario())
@@ -1,33 +1,206 @@
+import asyncio
+import logging
 import os
-from dotenv import load_dotenv
+from dataclasses import dataclass, fields, replace
+from functools import cached_property
+from typing import Optional, Union, get_args, get_origin
+from dotenv import dotenv_values, load_dotenv
 
 load_dotenv()
 
-class Config:
+logger = logging.getLogger(__name__)
+
+# Optional file whose values override the environment and that can be reloaded at runtime
+CONFIG_FILE = os.getenv("CONFIG_FILE", "settings.env")
+
+
+@dataclass(frozen=True)
+class Settings:
     """
-    Handles loading and managing configuration settings from the .env file.
+    Immutable snapshot of the bot's configuration.
+
+    Every field is read from the environment variable of the same name in
+    upper case (e.g. `resolver_workers` from `RESOLVER_WORKERS`), with values
+    in CONFIG_FILE taking precedence.
     """
 
-    def __init__(self):
-        self.config = {}
-        self.load_config()
+    # Credentials (changes only take effect after a restart)
+    discord_token: Optional[str] = None
+    youtube_api_key: Optional[str] = None
+    spotify_client_id: Optional[str] = None
+    spotify_client_secret: Optional[str] = None
+    soundcloud_client_id: Optional[str] = None
+    soundcloud_client_secret: Optional[str] = None
+    database_type: Optional[str] = None
+    database_host: Optional[str] = None
+    database_user: Optional[str] = None
+    database_password: Optional[str] = None
+    database_name: Optional[str] = None
+    prefix_commands: bool = True
+    sync_commands: bool = False  # Push the slash command tree to Discord on startup
+
+    # Performance tunables (picked up on reload)
+    resolver_workers: int = 4  # Threads resolving tracks off the event loop
+    loudness_cache_size: int = 1024  # Loudness values kept in memory in front of the database
+    prefetch_depth: int = 3  # Queued songs whose loudness is looked up ahead of time
+    max_decoders: int = 4  # Concurrent ffmpeg decoders
+    guild_max_decoders: int = 1  # Decoders a single guild can hold (one per voice connection)
+    guild_max_resolves: int = 2  # Resolver threads a single guild can hold
+    guild_weights: str = ""  # "guild_id:weight,..." shares relative to the default weight of 1
+    decoder_read_size: int = 4096  # Bytes read from ffmpeg per chunk
+    default_volume: float = 0.5
+    target_loudness: float = -16.0  # LUFS tracks are normalized towards
+    max_normalization_gain: float = 12.0  # dB
 
-    def load_config(self):
+    # Seconds between checks of CONFIG_FILE for changes
+    reload_interval: float = 5.0
+
+    def validate(self):
         """
-        Loads configuration settings from the .env file.
+        Raises ValueError if any setting is out of range.
         """
-        try:
-            for key, value in os.environ.items():
-                self.config[key] = value
-        except FileNotFoundError:
-            print("Error: .env file not found. Please create a .env file with your configuration settings.")
+        if self.database_type not in (None, "mysql", "postgresql", "mongodb"):
+            raise ValueError(f"Unsupported database type: {self.database_type}")
+        for name in ("resolver_workers", "max_decoders", "guild_max_decoders", "guild_max_resolves", "decoder_read_size"):
+            if getattr(self, name) < 1:
+                raise ValueError(f"{name.upper()} must be at least 1")
+        for name in ("loudness_cache_size", "prefetch_depth", "max_normalization_gain"):
+            if getattr(self, name) < 0:
+                raise ValueError(f"{name.upper()} must not be negative")
+        if not 0 <= self.default_volume <= 1:
+            raise ValueError("DEFAULT_VOLUME must be between 0 and 1")
+        if self.reload_interval <= 0:
+            raise ValueError("RELOAD_INTERVAL must be positive")
+        if any(weight <= 0 for weight in self.guild_weight_map.values()):
+            raise ValueError("GUILD_WEIGHTS must all be positive")
 
-    def get_value(self, key):
+    @cached_property
+    def guild_weight_map(self):
         """
-        Retrieves the value of a specific configuration setting.
+        Returns GUILD_WEIGHTS parsed into a {guild_id: weight} dictionary.
         """
+        weights = {}
+        for entry in filter(None, (part.strip() for part in self.guild_weights.split(","))):
+            try:
+                guild_id, weight = entry.split(":")
+                weights[int(guild_id)] = float(weight)
+            except ValueError:
+                raise ValueError(f"Invalid GUILD_WEIGHTS entry: {entry} (expected guild_id:weight)")
+        return weights
+
+
+def _parse_bool(value):
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"Invalid boolean: {value}")
+
+
+def _parse(field, value):
+    field_type = field.type
+    if get_origin(field_type) is Union:
+        # Optional[X]: empty means unset
+        if value == "":
+            return None
+        field_type = next(arg for arg in get_args(field_type) if arg is not type(None))
+    if field_type is bool:
+        return _parse_bool(value)
+    return field_type(value)
+
+
+def load_settings(path=CONFIG_FILE):
+    """
+    Parses and validates settings from the environment and the config file.
+
+    Raises:
+        ValueError: If a value can't be parsed or fails validation.
+    """
+    values = dict(os.environ)
+    if path and os.path.exists(path):
+        values.update({key: value for key, value in dotenv_values(path).items() if value is not None})
+
+    parsed = {}
+    for field in fields(Settings):
+        key = field.name.upper()
+        if key in values:
+            try:
+                parsed[field.name] = _parse(field, values[key])
+            except ValueError as e:
+                raise ValueError(f"Invalid value for {key}: {e}") from e
+
+    settings = Settings(**parsed)
+    settings.validate()
+    return settings
+
+
+# Credentials are bound to clients and connections created at startup
+_RESTART_ONLY = (
+    "discord_token", "youtube_api_key",
+    "spotify_client_id", "spotify_client_secret",
+    "soundcloud_client_id", "soundcloud_client_secret",
+    "database_type", "database_host", "database_user", "database_password", "database_name",
+    "prefix_commands", "sync_commands",
+)
+
+_settings = load_settings()
+
+
+def get_settings():
+    """
+    Returns the current settings snapshot.
+
+    Call this at the point of use rather than caching the result, so reloaded
+    values are picked up.
+    """
+    return _settings
+
+
+def reload_settings(path=CONFIG_FILE):
+    """
+    Re-reads the settings and swaps in the new snapshot. Invalid settings are
+    logged and the previous snapshot is kept.
+
+    Returns:
+        True if the new settings were valid, False otherwise.
+    """
+    global _settings
+    try:
+        settings = load_settings(path)
+    except ValueError as e:
+        logger.error(f"Keeping previous settings, reload failed: {e}")
+        return False
+
+    settings = replace(
+        settings,
+        **{name: getattr(_settings, name) for name in _RESTART_ONLY}
+    )
+    if settings != _settings:
+        _settings = settings
+        logger.info("Settings reloaded.")
+    return True
+
+
+async def watch_settings(path=CONFIG_FILE):
+    """
+    Reloads the settings whenever the config file's modification time changes.
+    Runs until cancelled; errors reading the file are logged and retried on
+    the next check.
+    """
+    last_modified = _modified_time(path)
+    while True:
+        await asyncio.sleep(get_settings().reload_interval)
         try:
-            return self.config[key]
-        except KeyError:
-            print(f"Error: Configuration setting '{key}' not found in .env file.")
-            return None
\ No newline at end of file
+            modified = _modified_time(path)
+            if modified != last_modified:
+                reload_settings(path)
+                last_modified = modified
+        except OSError as e:
+            logger.error(f"Error reading settings file '{path}': {e}")
+
+
+def _modified_time(path):
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
@@ -1,8 +1,10 @@
 import os
+import re
+import threading
 import mysql.connector
 import psycopg2
 import pymongo
-from utils.config import Config
+from utils.config import get_settings
 
 class Database:
     """
@@ -10,16 +12,18 @@ class Database:
     """
 
     def __init__(self):
-        self.config = Config()
+        settings = get_settings()
         self.connection = None
         self.cursor = None
-        self.database_type = self.config.get_value("DATABASE_TYPE")
+        self.database_type = settings.database_type
+        # Serializes queries issued from executor threads on the shared connection
+        self.lock = threading.Lock()
 
-        # Get database credentials from the .env file
-        self.host = self.config.get_value("DATABASE_HOST")
-        self.user = self.config.get_value("DATABASE_USER")
-        self.password = self.config.get_value("DATABASE_PASSWORD")
-        self.database = self.config.get_value("DATABASE_NAME")
+        # Get database credentials from the shared settings
+        self.host = settings.database_host
+        self.user = settings.database_user
+        self.password = settings.database_password
+        self.database = settings.database_name
 
     def connect(self):
         """
@@ -47,12 +51,34 @@ class Database:
             else:
                 raise ValueError(f"Unsupported database type: {self.database_type}")
 
-            self.cursor = self.connection.cursor()
+            if self.database_type in ("mysql", "postgresql"):
+                # Each statement is its own transaction, so reads see other shards' writes
+                # and a failed statement doesn't leave the shared connection in an aborted transaction
+                self.connection.autocommit = True
+                self.cursor = self.connection.cursor()
             print(f"Connected to {self.database_type} database: {self.database}")
 
         except Exception as e:
             print(f"Error connecting to database: {e}")
             self.disconnect()
+            self.connection = None
+            self.cursor = None
+
+    def rollback(self):
+        """
+        Rolls back the current transaction after a failed statement, if any.
+        """
+        try:
+            if self.database_type in ("mysql", "postgresql") and self.connection:
+                self.connection.rollback()
+        except Exception as e:
+            print(f"Error rolling back transaction: {e}")
+
+    def is_connected(self):
+        """
+        Returns True if a connection was established, False otherwise.
+        """
+        return self.connection is not None
 
     def disconnect(self):
         """
@@ -60,7 +86,8 @@ class Database:
         """
         try:
             if self.connection:
-                self.cursor.close()
+                if self.cursor:
+                    self.cursor.close()
                 self.connection.close()
                 print(f"Disconnected from {self.database_type} database: {self.database}")
         except Exception as e:
@@ -210,4 +237,147 @@ class Database:
 
         except Exception as e:
             print(f"Error selecting data from table '{table_name}': {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def create_tracks_table(self):
+        """
+        Creates the table holding track metadata and cached loudness, if it
+        doesn't exist yet.
+        """
+        try:
+            if self.database_type in ("mysql", "postgresql"):
+                self.cursor.execute(
+                    "CREATE TABLE IF NOT EXISTS tracks ("
+                    "track_id VARCHAR(512) PRIMARY KEY, "
+                    "title VARCHAR(512), "
+                    "artist VARCHAR(512), "
+                    "loudness DOUBLE PRECISION, "
+                    "peak DOUBLE PRECISION)"
+                )
+                self.connection.commit()
+
+            elif self.database_type == "mongodb":
+                self.connection[self.database]["tracks"].create_index("track_id", unique=True)
+
+            else:
+                raise ValueError(f"Unsupported database type: {self.database_type}")
+
+        except Exception as e:
+            print(f"Error creating table 'tracks': {e}")
+
+    def get_track_loudness(self, track_id):
+        """
+        Retrieves the cached integrated loudness and sample peak of a track.
+
+        Args:
+            track_id: The stable identifier (page URL) of the track.
+
+        Returns:
+            A (loudness, peak) tuple in LUFS and dBFS, or None if the track hasn't been measured.
+        """
+        try:
+            with self.lock:
+                if self.database_type in ("mysql", "postgresql"):
+                    self.cursor.execute("SELECT loudness, peak FROM tracks WHERE track_id = %s", (track_id,))
+                    row = self.cursor.fetchone()
+                    return (row[0], row[1]) if row and row[0] is not None else None
+
+                elif self.database_type == "mongodb":
+                    track = self.connection[self.database]["tracks"].find_one(
+                        {"track_id": track_id},
+                        {"_id": 0, "loudness": 1, "peak": 1}
+                    )
+                    return (track["loudness"], track.get("peak")) if track and track.get("loudness") is not None else None
+
+                else:
+                    raise ValueError(f"Unsupported database type: {self.database_type}")
+
+        except Exception as e:
+            print(f"Error selecting loudness for track '{track_id}': {e}")
+            with self.lock:
+                self.rollback()
+            return None
+
+    def save_track_loudness(self, track_id, title, artist, loudness, peak):
+        """
+        Stores the measured integrated loudness and sample peak alongside the track metadata.
+
+        Args:
+            track_id: The stable identifier (page URL) of the track.
+            title: The title of the track.
+            artist: The artist of the track.
+            loudness: The integrated loudness in LUFS.
+            peak: The sample peak in dBFS, or None if the track was silent.
+        """
+        try:
+            with self.lock:
+                if self.database_type == "mysql":
+                    self.cursor.execute(
+                        "INSERT INTO tracks (track_id, title, artist, loudness, peak) VALUES (%s, %s, %s, %s, %s) "
+                        "ON DUPLICATE KEY UPDATE title = VALUES(title), artist = VALUES(artist), "
+                        "loudness = VALUES(loudness), peak = VALUES(peak)",
+                        (track_id, title, artist, loudness, peak)
+                    )
+                    self.connection.commit()
+
+                elif self.database_type == "postgresql":
+                    self.cursor.execute(
+                        "INSERT INTO tracks (track_id, title, artist, loudness, peak) VALUES (%s, %s, %s, %s, %s) "
+                        "ON CONFLICT (track_id) DO UPDATE SET title = EXCLUDED.title, artist = EXCLUDED.artist, "
+                        "loudness = EXCLUDED.loudness, peak = EXCLUDED.peak",
+                        (track_id, title, artist, loudness, peak)
+                    )
+                    self.connection.commit()
+
+                elif self.database_type == "mongodb":
+                    self.connection[self.database]["tracks"].update_one(
+                        {"track_id": track_id},
+                        {"$set": {"title": title, "artist": artist, "loudness": loudness, "peak": peak}},
+                        upsert=True
+                    )
+
+                else:
+                    raise ValueError(f"Unsupported database type: {self.database_type}")
+
+        except Exception as e:
+            print(f"Error saving loudness for track '{track_id}': {e}")
+            with self.lock:
+                self.rollback()
+
+    def search_tracks(self, text, limit=25):
+        """
+        Finds previously played tracks whose title contains the given text.
+
+        Args:
+            text: The text to search for.
+            limit: The maximum number of tracks to return.
+
+        Returns:
+            A list of (title, artist, track_id) tuples.
+        """
+        try:
+            with self.lock:
+                if self.database_type in ("mysql", "postgresql"):
+                    # Match the text literally; backslash is the default LIKE escape in both databases
+                    pattern = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                    self.cursor.execute(
+                        "SELECT title, artist, track_id FROM tracks WHERE LOWER(title) LIKE LOWER(%s) LIMIT %s",
+                        (f"%{pattern}%", limit)
+                    )
+                    return self.cursor.fetchall()
+
+                elif self.database_type == "mongodb":
+                    tracks = self.connection[self.database]["tracks"].find(
+                        {"title": {"$regex": re.escape(text), "$options": "i"}},
+                        {"_id": 0, "title": 1, "artist": 1, "track_id": 1}
+                    ).limit(limit)
+                    return [(track["title"], track["artist"], track["track_id"]) for track in tracks]
+
+                else:
+                    raise ValueError(f"Unsupported database type: {self.database_type}")
+
+        except Exception as e:
+            print(f"Error searching tracks for '{text}': {e}")
+            with self.lock:
+                self.rollback()
+            return []
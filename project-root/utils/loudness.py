@@ -0,0 +1,116 @@
+import logging
+import numpy as np
+from scipy.signal import lfilter
+from utils.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 48000
+CHANNELS = 2
+FRAME_SIZE = CHANNELS * 2  # s16le stereo frame in bytes
+
+# EBU R128 gating parameters
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+SUB_BLOCK = SAMPLE_RATE // 10  # 100 ms hop
+BLOCK_SUB_BLOCKS = 4  # 400 ms gating block, 75% overlap
+
+# ITU-R BS.1770 K-weighting at 48 kHz: high shelf followed by high pass,
+# combined into a single fourth-order filter.
+_SHELF_B = [1.53512485958697, -2.69169618940638, 1.19839281085285]
+_SHELF_A = [1.0, -1.69065929318241, 0.73248077421585]
+_HIGHPASS_B = [1.0, -2.0, 1.0]
+_HIGHPASS_A = [1.0, -1.99004745483398, 0.99007225036621]
+K_WEIGHT_B = np.convolve(_SHELF_B, _HIGHPASS_B)
+K_WEIGHT_A = np.convolve(_SHELF_A, _HIGHPASS_A)
+
+
+class LoudnessMeter:
+    """
+    Measures EBU R128 integrated loudness of a decoded s16le/48kHz/stereo stream.
+
+    PCM is fed in arbitrarily sized chunks as it is decoded, so the
+    measurement can piggyback on playback instead of needing its own decode.
+    Only the mean square of each 100 ms sub-block and the running sample peak
+    are kept.
+    """
+
+    def __init__(self):
+        self.filter_state = np.zeros((len(K_WEIGHT_A) - 1, CHANNELS))
+        self.leftover = b""
+        self.pending = np.empty((0, CHANNELS))
+        self.sub_blocks = []
+        self.peak = 0.0
+
+    def feed(self, pcm):
+        """
+        Adds a chunk of decoded PCM to the measurement.
+        """
+        data = self.leftover + pcm
+        usable = len(data) - len(data) % FRAME_SIZE
+        self.leftover = data[usable:]
+        if not usable:
+            return
+
+        samples = np.frombuffer(data[:usable], dtype="<i2").reshape(-1, CHANNELS) / 32768.0
+        self.peak = max(self.peak, float(np.abs(samples).max()))
+        weighted, self.filter_state = lfilter(K_WEIGHT_B, K_WEIGHT_A, samples, axis=0, zi=self.filter_state)
+        self.pending = np.concatenate((self.pending, weighted))
+
+        count = len(self.pending) // SUB_BLOCK
+        if count:
+            complete = self.pending[:count * SUB_BLOCK].reshape(count, SUB_BLOCK, CHANNELS)
+            # Channel weights are 1.0 for left and right
+            self.sub_blocks.append(np.mean(complete ** 2, axis=1).sum(axis=1))
+            self.pending = self.pending[count * SUB_BLOCK:]
+
+    def integrated_loudness(self):
+        """
+        Returns the gated integrated loudness in LUFS, or None if the stream
+        was too short or silent to measure.
+        """
+        if not self.sub_blocks:
+            return None
+
+        sub_blocks = np.concatenate(self.sub_blocks)
+        if len(sub_blocks) < BLOCK_SUB_BLOCKS:
+            return None
+
+        # Mean square of each overlapping 400 ms block
+        blocks = np.convolve(sub_blocks, np.full(BLOCK_SUB_BLOCKS, 1.0 / BLOCK_SUB_BLOCKS), mode="valid")
+        with np.errstate(divide="ignore"):
+            block_loudness = -0.691 + 10 * np.log10(blocks)
+
+        gated = blocks[block_loudness > ABSOLUTE_GATE]
+        if not len(gated):
+            return None
+
+        relative_gate = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE
+        gated = blocks[(block_loudness > ABSOLUTE_GATE) & (block_loudness > relative_gate)]
+        return float(-0.691 + 10 * np.log10(gated.mean()))
+
+    def peak_level(self):
+        """
+        Returns the sample peak in dBFS, or None if the stream was silent.
+        """
+        if self.peak <= 0:
+            return None
+        return float(20 * np.log10(self.peak))
+
+
+def normalization_gain(loudness, peak=None):
+    """
+    Returns the gain in dB that brings a track of the given loudness to the
+    configured target loudness, clamped to the configured maximum gain.
+
+    When the track's sample peak (dBFS) is known, positive gain is further
+    limited to the available headroom so the output doesn't clip.
+    """
+    if loudness is None:
+        return 0.0
+    settings = get_settings()
+    max_gain = settings.max_normalization_gain
+    gain = float(np.clip(settings.target_loudness - loudness, -max_gain, max_gain))
+    if peak is not None and gain > 0:
+        gain = max(min(gain, -float(peak)), 0.0)
+    return gain
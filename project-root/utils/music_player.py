@@ -1,6 +1,10 @@
 import asyncio
 import subprocess
 import logging
+import math
+from utils.config import get_settings
+from utils.loudness import LoudnessMeter, normalization_gain
+from utils.scheduler import decoder_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -10,43 +14,100 @@ class MusicPlayer:
     def __init__(self):
         self.player = None
         self.current_stream = None
-        self.volume = 0.5  # Default volume
+        self.volume = get_settings().default_volume
+        # Set while a track is waiting for a decoder, before ffmpeg is running
+        self.starting = False
 
-    async def play(self, stream_url, voice_client):
-        """Starts playing the provided audio stream."""
+    def reserve(self):
+        """Marks the player as starting, so is_playing() is True until playback begins or fails."""
+        self.starting = True
+
+    async def play(self, stream_url, voice_client, loudness=None, peak=None, guild_id=None, on_start=None):
+        """Starts playing the provided audio stream.
+
+        Waits for a decoder slot first, so playback may start later when the
+        host's decoders are busy.
+
+        Args:
+            stream_url: The URL of the audio stream.
+            voice_client: The voice client to send audio to.
+            loudness: The cached integrated loudness of the track (LUFS). When
+                given, it is applied as a precomputed normalization gain. When
+                None, the track is measured while it plays instead.
+            peak: The cached sample peak of the track (dBFS), used to limit
+                the normalization gain to the available headroom.
+            guild_id: The guild playing, used to share decoders fairly.
+            on_start: Optional coroutine function awaited once ffmpeg is running.
+
+        Returns:
+            A (loudness, peak) tuple measured from the source if the track was
+            measured and played to the end, otherwise None.
+        """
         try:
+            self.reserve()
+
             # Stop any existing playback
             if self.player:
                 await self.stop()
 
-            self.current_stream = stream_url
-
-            # ffmpeg command for playing audio
-            self.player = await asyncio.create_subprocess_exec(
-                "ffmpeg",
-                "-loglevel", "panic",  # Suppress ffmpeg logging
-                "-i", stream_url,
-                "-vn",  # Disable video output
-                "-af", f"volume={self.volume}",  # Apply volume
-                "-f", "s16le",
-                "-ar", "48000",
-                "-ac", "2",
-                "pipe:1",
-                stdout=subprocess.PIPE,
-            )
-
-            # Send audio data to Discord voice client
-            while True:
-                audio_data = await self.player.stdout.read(1024)
-                if not audio_data:
-                    break
-                voice_client.play(discord.PCMVolumeTransformer(discord.Audio(audio_data), volume=self.volume))
-
-            # Wait for ffmpeg to finish
-            await self.player.wait()
-            logger.info("Music playback finished.")
+            async with decoder_scheduler.slot(guild_id):
+                self.current_stream = stream_url
+                volume = self.volume
+                gain = normalization_gain(loudness, peak)
+                # Only measure when the output can be mapped back to the source level
+                meter = LoudnessMeter() if loudness is None and volume > 0 else None
+
+                # ffmpeg command for playing audio
+                self.player = await asyncio.create_subprocess_exec(
+                    "ffmpeg",
+                    "-loglevel", "panic",  # Suppress ffmpeg logging
+                    "-i", stream_url,
+                    "-vn",  # Disable video output
+                    "-af", f"volume={volume},volume={gain}dB",  # Apply volume and normalization gain
+                    "-f", "s16le",
+                    "-ar", "48000",
+                    "-ac", "2",
+                    "pipe:1",
+                    stdout=subprocess.PIPE,
+                )
+                process = self.player
+                try:
+                    self.starting = False
+                    if on_start:
+                        await on_start()
+                    read_size = get_settings().decoder_read_size
+
+                    # Send audio data to Discord voice client
+                    while True:
+                        audio_data = await process.stdout.read(read_size)
+                        if not audio_data:
+                            break
+                        if meter:
+                            meter.feed(audio_data)
+                        voice_client.play(discord.PCMVolumeTransformer(discord.Audio(audio_data), volume=self.volume))
+
+                    # Wait for ffmpeg to finish
+                    await process.wait()
+                    logger.info("Music playback finished.")
+                finally:
+                    # Only give the decoder slot back once ffmpeg is gone, even on errors or cancellation
+                    if process.returncode is None:
+                        process.kill()
+                        await process.wait()
+
+            # A stopped or failed stream only covers part of the track
+            if meter and process.returncode == 0 and self.player is process:
+                measured = meter.integrated_loudness()
+                if measured is not None:
+                    # Map the output levels back to the source by removing the applied volume
+                    offset = 20 * math.log10(volume)
+                    measured_peak = meter.peak_level()
+                    return measured - offset, measured_peak - offset if measured_peak is not None else None
         except Exception as e:
             logger.error(f"Error playing music: {e}")
+        finally:
+            self.starting = False
+        return None
 
     async def stop(self):
         """Stops the current music playback."""
@@ -80,8 +141,8 @@ class MusicPlayer:
             logger.error(f"Error resuming music: {e}")
 
     def is_playing(self):
-        """Returns True if music is currently playing, False otherwise."""
-        return self.player is not None and self.player.returncode is None
+        """Returns True if music is currently playing or waiting to start, False otherwise."""
+        return self.starting or (self.player is not None and self.player.returncode is None)
 
     def is_paused(self):
         """Returns True if music is currently paused, False otherwise."""
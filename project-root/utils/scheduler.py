@@ -0,0 +1,210 @@
+import asyncio
+import contextlib
+import time
+from collections import Counter, deque
+from utils.config import get_settings
+
+# Request priorities; lower values are served first
+INTERACTIVE = 0
+PREFETCH = 1
+
+
+class _Request:
+    """A caller waiting for a slot."""
+
+    def __init__(self, guild_id, priority, finish_tag, future):
+        self.guild_id = guild_id
+        self.priority = priority
+        self.finish_tag = finish_tag
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class FairScheduler:
+    """
+    Shares a fixed number of slots (decoders, resolver threads) between guilds.
+
+    Waiting requests are served by priority first, then by weighted fair
+    queuing across guilds: each request gets a virtual finish tag that grows
+    with the guild's own backlog at that priority, so a guild queuing many
+    requests at once only gets its weighted share while other guilds are
+    waiting. Tags are kept per priority, so a guild's prefetch backlog doesn't
+    delay its interactive requests. Guilds at their quota of running slots are
+    skipped until one is released.
+    """
+
+    def __init__(self, name, capacity, guild_quota, guild_weight=lambda guild_id: 1.0):
+        """
+        Args:
+            name: Name reported in metrics.
+            capacity: Callable returning the total number of slots.
+            guild_quota: Callable returning the maximum slots one guild can hold.
+            guild_weight: Callable returning a guild's share relative to other guilds.
+        """
+        self.name = name
+        self.capacity = capacity
+        self.guild_quota = guild_quota
+        self.guild_weight = guild_weight
+        self.waiting = {INTERACTIVE: {}, PREFETCH: {}}
+        self.running = Counter()
+        self.active = 0
+        # Virtual clocks per priority, and finish tags per (guild_id, priority)
+        self.virtual_time = {priority: 0.0 for priority in self.waiting}
+        self.finish_tags = {}
+        self.wait_stats = {priority: {"count": 0, "total": 0.0, "max": 0.0} for priority in self.waiting}
+
+    async def acquire(self, guild_id, priority=INTERACTIVE, cost=1.0):
+        """
+        Waits until a slot is granted to the guild.
+
+        Args:
+            guild_id: The guild the work is done for.
+            priority: INTERACTIVE for user-facing requests, PREFETCH for background work.
+            cost: Relative size of the request.
+        """
+        key = (guild_id, priority)
+        start_tag = max(self.virtual_time[priority], self.finish_tags.get(key, 0.0))
+        finish_tag = start_tag + cost / self.guild_weight(guild_id)
+        self.finish_tags[key] = finish_tag
+        request = _Request(guild_id, priority, finish_tag, asyncio.get_running_loop().create_future())
+        self.waiting[priority].setdefault(guild_id, deque()).append(request)
+        self._dispatch()
+
+        try:
+            await request.future
+        except asyncio.CancelledError:
+            if request.future.done() and not request.future.cancelled():
+                # Granted just before the cancellation landed
+                self.release(guild_id)
+            else:
+                self._remove(request)
+            raise
+
+        waited = time.monotonic() - request.enqueued
+        stats = self.wait_stats[priority]
+        stats["count"] += 1
+        stats["total"] += waited
+        stats["max"] = max(stats["max"], waited)
+
+    def release(self, guild_id):
+        """Returns a slot acquired by the guild."""
+        self.active -= 1
+        self.running[guild_id] -= 1
+        if not self.running[guild_id]:
+            del self.running[guild_id]
+        self._dispatch()
+        self._forget_idle(guild_id)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, guild_id, priority=INTERACTIVE, cost=1.0):
+        """Holds a slot for the duration of the block."""
+        await self.acquire(guild_id, priority, cost)
+        try:
+            yield
+        finally:
+            self.release(guild_id)
+
+    def _dispatch(self):
+        """Grants slots to waiting requests while capacity is available."""
+        while self.active < self.capacity():
+            request = self._next_request()
+            if request is None:
+                break
+
+            queues = self.waiting[request.priority]
+            queues[request.guild_id].popleft()
+            if not queues[request.guild_id]:
+                del queues[request.guild_id]
+
+            self.active += 1
+            self.running[request.guild_id] += 1
+            self.virtual_time[request.priority] = max(self.virtual_time[request.priority], request.finish_tag)
+            request.future.set_result(None)
+
+    def _next_request(self):
+        """Returns the highest priority, earliest finishing request of a guild under quota."""
+        quota = self.guild_quota()
+        for priority in sorted(self.waiting):
+            candidates = [
+                requests[0] for guild_id, requests in self.waiting[priority].items()
+                if self.running[guild_id] < quota
+            ]
+            if candidates:
+                return min(candidates, key=lambda request: request.finish_tag)
+        return None
+
+    def _remove(self, request):
+        """Drops a cancelled request from its queue."""
+        queues = self.waiting[request.priority]
+        requests = queues.get(request.guild_id)
+        if requests and request in requests:
+            requests.remove(request)
+            if not requests:
+                del queues[request.guild_id]
+        self._forget_idle(request.guild_id)
+
+    def _forget_idle(self, guild_id):
+        """Drops the finish tags of a guild with nothing running or waiting."""
+        if guild_id in self.running:
+            return
+        if any(guild_id in queues for queues in self.waiting.values()):
+            return
+        for priority in self.waiting:
+            self.finish_tags.pop((guild_id, priority), None)
+
+    def queue_depth(self, guild_id=None, priority=None):
+        """Returns the number of waiting requests, optionally for one guild and/or priority."""
+        priorities = [priority] if priority is not None else self.waiting
+        depth = 0
+        for p in priorities:
+            for waiting_guild, requests in self.waiting[p].items():
+                if guild_id is None or waiting_guild == guild_id:
+                    depth += len(requests)
+        return depth
+
+    def metrics(self):
+        """
+        Returns a snapshot of the scheduler's state.
+
+        Returns:
+            A dictionary with running and capacity counts, queue depth per
+            priority and per guild, and wait-time statistics (seconds) per priority.
+        """
+        depth_by_guild = Counter()
+        for queues in self.waiting.values():
+            for guild_id, requests in queues.items():
+                depth_by_guild[guild_id] += len(requests)
+
+        return {
+            "name": self.name,
+            "running": self.active,
+            "capacity": self.capacity(),
+            "queue_depth": {
+                "interactive": self.queue_depth(priority=INTERACTIVE),
+                "prefetch": self.queue_depth(priority=PREFETCH),
+            },
+            "queue_depth_by_guild": dict(depth_by_guild),
+            "wait_time": {
+                name: {
+                    "count": stats["count"],
+                    "average": stats["total"] / stats["count"] if stats["count"] else 0.0,
+                    "max": stats["max"],
+                }
+                for name, stats in (("interactive", self.wait_stats[INTERACTIVE]), ("prefetch", self.wait_stats[PREFETCH]))
+            },
+        }
+
+
+# Host-wide schedulers shared by every guild
+decoder_scheduler = FairScheduler(
+    "decoder",
+    capacity=lambda: get_settings().max_decoders,
+    guild_quota=lambda: get_settings().guild_max_decoders,
+    guild_weight=lambda guild_id: get_settings().guild_weight_map.get(guild_id, 1.0),
+)
+resolver_scheduler = FairScheduler(
+    "resolver",
+    capacity=lambda: get_settings().resolver_workers,
+    guild_quota=lambda: get_settings().guild_max_resolves,
+    guild_weight=lambda guild_id: get_settings().guild_weight_map.get(guild_id, 1.0),
+)